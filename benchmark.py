@@ -0,0 +1,260 @@
+"""
+离线基准：本地 stand-in 话题页 + 真实 Chrome
+对比不同浏览器配置下浏览评论的 CPU 时间和墙钟时间（不访问 linux.do，不需要账号）
+
+用法（屏幕尺寸与原先的运行环境一致：1920x1080 且不设 --window-size，default 行即基线；
+low_cost_render 行自带 --window-size=LOW_COST_WINDOW_SIZE）：
+  xvfb-run -a --server-args="-screen 0 1920x1080x24" python benchmark.py --rounds 3 --pages 3
+"""
+
+import argparse
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 基准只关心渲染/驱动开销：把人类节奏相关的停留压到很短（可用 env 覆盖）
+os.environ.setdefault("MIN_READ_STAY", "0.5")
+os.environ.setdefault("READ_STATE_TIMEOUT", "2")
+os.environ.setdefault("READ_DELAY_MIN", "0.05")
+os.environ.setdefault("READ_DELAY_MAX", "0.1")
+os.environ.setdefault("BOTTOM_EXTRA_STAY_MIN", "0.3")
+os.environ.setdefault("BOTTOM_EXTRA_STAY_MAX", "0.6")
+
+import psutil  # noqa: E402  DrissionPage 的依赖
+from loguru import logger  # noqa: E402
+from tabulate import tabulate  # noqa: E402
+
+import main  # noqa: E402
+
+
+# ----------------------------
+# Stand-in topic page
+# ----------------------------
+# 模拟 Discourse 话题页：post_N 楼层 + read-state 蓝点 + /topics/timings 上报 + 滚动到底部追加加载 + 一些动画/过渡
+STANDIN_TOPIC_HTML = r"""<!doctype html>
+<html><head><meta charset="utf-8"><title>stand-in topic</title>
+<style>
+  body { font-family: sans-serif; margin: 0 auto; max-width: 760px; }
+  .topic-post { border-bottom: 1px solid #ddd; padding: 16px; transition: background .4s; }
+  .topic-post:hover { background: #f6f6f6; }
+  .read-state { display: inline-block; width: 8px; height: 8px; border-radius: 50%;
+                background: #08c; transition: opacity .6s; }
+  .read-state.read { opacity: 0; }
+  .spinner { width: 24px; height: 24px; border: 3px solid #ccc; border-top-color: #08c;
+             border-radius: 50%; animation: spin 1s linear infinite; margin: 16px auto; }
+  @keyframes spin { to { transform: rotate(360deg); } }
+  html { scroll-behavior: smooth; }
+</style></head>
+<body><div id="main-outlet"><div id="stream"></div><div class="spinner"></div></div>
+<script>
+  const TOTAL = __TOTAL__, CHUNK = 20;
+  const stream = document.getElementById('stream');
+  let loaded = 0;
+  function more() {
+    const end = Math.min(TOTAL, loaded + CHUNK);
+    for (let n = loaded + 1; n <= end; n++) {
+      const el = document.createElement('article');
+      el.id = 'post_' + n;
+      el.className = 'topic-post';
+      el.innerHTML = '<div class="topic-meta-data"><span class="read-state"></span> #' + n + '</div>'
+        + '<div class="post__regular regular post__contents contents"><p>'
+        + ('stand-in reply ' + n + ' ').repeat(20 + (n % 7) * 10) + '</p></div>';
+      stream.appendChild(el);
+    }
+    loaded = end;
+  }
+  more();
+  window.addEventListener('scroll', () => {
+    const d = document.documentElement;
+    if (d.scrollHeight - (window.scrollY + window.innerHeight) < 600 && loaded < TOTAL) more();
+  });
+  // 视口内停留 1s 的楼层上报 /topics/timings，成功后标记已读（对应 Discourse 的 ScreenTrack）
+  setInterval(() => {
+    const nums = [];
+    document.querySelectorAll('.read-state:not(.read)').forEach(rs => {
+      const r = rs.getBoundingClientRect();
+      if (r.top >= 0 && r.bottom <= window.innerHeight) {
+        rs.dataset.seen = (+rs.dataset.seen || 0) + 1;
+        if (+rs.dataset.seen >= 2 && !rs.dataset.sent) {
+          rs.dataset.sent = 1;
+          nums.push(+rs.closest('article').id.slice(5));
+        }
+      }
+    });
+    if (!nums.length) return;
+    const body = nums.map(n => `timings%5B${n}%5D=1000`).join('&') + '&topic_time=1000&topic_id=1';
+    fetch('/topics/timings', {method: 'POST', body,
+      headers: {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}})
+      .then(r => { if (r.ok) nums.forEach(n =>
+        document.querySelector(`#post_${n} .read-state`).classList.add('read')); });
+  }, 500);
+</script></body></html>
+"""
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    total_posts = 200
+
+    def do_GET(self):
+        body = STANDIN_TOPIC_HTML.replace("__TOTAL__", str(self.total_posts)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # /topics/timings：读掉请求体，返回空 JSON
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_standin(total_posts=200):
+    """启动本地 stand-in 服务，返回 (server, topic_url)"""
+    handler = type("StandinHandler", (_StandinHandler,), {"total_posts": total_posts})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/t/standin/1"
+
+
+# ----------------------------
+# Measure
+# ----------------------------
+def _browser_cpu_seconds(browser) -> float:
+    try:
+        root = psutil.Process(browser.process_id)
+    except Exception:
+        return 0.0
+    total = 0.0
+    for p in [root] + root.children(recursive=True):
+        try:
+            t = p.cpu_times()
+            total += t.user + t.system
+        except Exception:
+            pass
+    return total
+
+
+def bench_once(topic_url, pages, profiler=None, **browser_kwargs) -> dict:
+    b = main.LinuxDoBrowser(**browser_kwargs)
+    b.profiler = profiler
+    try:
+        b._ensure_browser()
+        cpu0 = _browser_cpu_seconds(b.browser)
+        py0 = time.process_time()
+        t0 = time.perf_counter()
+
+        tab = b.new_tab()
+        tab.read_tracker = main.ReadTimingsTracker()
+        tab.listen_network(tab.read_tracker.handle_event)
+        tab.get(topic_url)
+        b.browse_replies_pages(tab, min_pages=pages, max_pages=pages)
+        b._mem_snapshot("after-topic")
+
+        wall = time.perf_counter() - t0
+        py_cpu = time.process_time() - py0
+        chrome_cpu = _browser_cpu_seconds(b.browser) - cpu0
+        try:
+            tab.close()
+        except Exception:
+            pass
+    finally:
+        b.close()
+    return {"wall": wall, "chrome_cpu": chrome_cpu, "py_cpu": py_cpu}
+
+
+def bench_calls(topic_url, calls, **browser_kwargs) -> dict:
+    """单次驱动调用开销：逐个 run_js vs 一批 run_js_many"""
+    b = main.LinuxDoBrowser(**browser_kwargs)
+    try:
+        b._ensure_browser()
+        tab = b.new_tab()
+        tab.get(topic_url)
+        js = "return document.querySelectorAll('[id^=\"post_\"]').length;"
+
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            tab.run_js(js)
+        seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        tab.run_js_many([(js, ()) for _ in range(calls)])
+        batch = time.perf_counter() - t0
+        try:
+            tab.close()
+        except Exception:
+            pass
+    finally:
+        b.close()
+    return {"seq_ms": seq * 1000 / calls, "batch_ms": batch * 1000 / calls}
+
+
+# 参与对比的配置：名称 -> LinuxDoBrowser(**kwargs)
+CONFIGS = {
+    "default": {"low_cost_render": False, "driver": "drissionpage"},
+    "low_cost_render": {"low_cost_render": True, "driver": "drissionpage"},
+    "cdp": {"low_cost_render": False, "driver": "cdp"},
+    "cdp+low_cost_render": {"low_cost_render": True, "driver": "cdp"},
+}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="LinuxDoBrowser 离线基准")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=200, help="驱动调用开销测试的调用次数，0 跳过")
+    parser.add_argument("--profile", default="", help="剖析输出目录：每个配置一份 collapsed-stack + tracemalloc 报告")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="逗号分隔，可选: " + ",".join(CONFIGS))
+    args = parser.parse_args()
+
+    server, topic_url = serve_standin(args.posts)
+    logger.info(f"stand-in topic: {topic_url}")
+
+    names = [c.strip() for c in args.configs.split(",") if c.strip()]
+    rows = []
+    call_rows = []
+    try:
+        for name in names:
+            if args.calls > 0:
+                r = bench_calls(topic_url, args.calls, **CONFIGS[name])
+                call_rows.append([name, f"{r['seq_ms']:.2f}", f"{r['batch_ms']:.2f}"])
+            profiler = main.RunProfiler(args.profile, label=name).start() if args.profile else None
+            try:
+                results = [
+                    bench_once(topic_url, args.pages, profiler=profiler, **CONFIGS[name])
+                    for _ in range(args.rounds)
+                ]
+            finally:
+                if profiler:
+                    profiler.stop()
+            n = len(results)
+            rows.append(
+                [
+                    name,
+                    f"{sum(r['wall'] for r in results) / n:.2f}",
+                    f"{sum(r['chrome_cpu'] for r in results) / n:.2f}",
+                    f"{sum(r['py_cpu'] for r in results) / n:.2f}",
+                ]
+            )
+    finally:
+        server.shutdown()
+
+    if call_rows:
+        print(f"--------------Driver call overhead ({args.calls} calls)-----------------")
+        print(tabulate(call_rows, headers=["配置", "run_js(ms/次)", "run_js_many(ms/次)"], tablefmt="pretty"))
+    print(f"--------------Benchmark ({args.rounds} rounds, {args.pages} pages)-----------------")
+    print(tabulate(rows, headers=["配置", "墙钟(s)", "Chrome CPU(s)", "Python CPU(s)"], tablefmt="pretty"))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -4,17 +4,32 @@ new Env("Linux.Do 签到")
 """
 
 import os
+import json
+import math
 import random
 import time
 import functools
+import itertools
+import atexit
+import base64
+import queue
 import re
+import signal
+import subprocess
+import sys
 import tempfile
+import threading
+import tracemalloc
+import urllib.request
 from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import unquote
 
 from loguru import logger
 from tabulate import tabulate
 from bs4 import BeautifulSoup
 from curl_cffi import requests
+import websocket
 
 from DrissionPage import ChromiumOptions, Chromium
 
@@ -74,6 +89,13 @@ MAX_TOPICS = int(os.environ.get("MAX_TOPICS", "10"))
 MIN_COMMENT_PAGES = int(os.environ.get("MIN_COMMENT_PAGES", "5"))
 MAX_COMMENT_PAGES = int(os.environ.get("MAX_COMMENT_PAGES", "10"))
 
+# 浏览前先按 connect 要求表 + 未读数规划工作量：已达标/无未读时只登录不浏览
+WORKLOAD_PRECHECK = os.environ.get("WORKLOAD_PRECHECK", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+
 # “翻一页评论”的判定：最大楼层号增长多少算 1 页（建议 8~15；默认 10）
 PAGE_GROW = int(os.environ.get("PAGE_GROW", "10"))
 
@@ -102,6 +124,70 @@ NEAR_BOTTOM_GAP = int(os.environ.get("NEAR_BOTTOM_GAP", "140"))
 BOTTOM_EXTRA_STAY_MIN = float(os.environ.get("BOTTOM_EXTRA_STAY_MIN", "6"))
 BOTTOM_EXTRA_STAY_MAX = float(os.environ.get("BOTTOM_EXTRA_STAY_MAX", "12"))
 
+# 低渲染开销模式：脚本只依赖 DOM 状态和滚动位置，不需要像素
+# 小窗口 + 关闭动画/过渡/平滑滚动 + 精简光栅化；配合 workflow 里的小尺寸 Xvfb 屏幕
+LOW_COST_RENDER = os.environ.get("LOW_COST_RENDER", "false").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+LOW_COST_WINDOW_SIZE = os.environ.get("LOW_COST_WINDOW_SIZE", "1024,768")
+
+# 断点续跑：每完成一个话题 / 每计满一页评论写一次断点；未过期的断点在下次启动时续跑
+CHECKPOINT_ENABLED = os.environ.get("CHECKPOINT_ENABLED", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+CHECKPOINT_FILE = os.environ.get(
+    "CHECKPOINT_FILE", os.path.join(tempfile.gettempdir(), "linuxdo_checkpoint.json")
+)
+# 断点有效期（秒）：超过即视为新一轮任务
+# 需覆盖 workflow 的调度间隔（每 4 小时 + 0~1 小时随机延迟 + 运行时长），否则被取消的一轮等不到续跑
+CHECKPOINT_TTL = float(os.environ.get("CHECKPOINT_TTL", str(6 * 3600)))
+# 断点里是否保存登录 Cookie（共享缓存等不可信存储上建议关掉，续跑时会重新登录）
+CHECKPOINT_SESSION = os.environ.get("CHECKPOINT_SESSION", "true").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+
+# 浏览器驱动后端：drissionpage（默认）或 cdp（单条 websocket 直连 CDP）
+BROWSER_DRIVER = os.environ.get("BROWSER_DRIVER", "drissionpage").strip().lower()
+
+# 看门狗：单次 JS 调用超时（秒）/ 连续超时几次判定 tab 卡死 / 单个话题总时限（秒）
+JS_CALL_TIMEOUT = float(os.environ.get("JS_CALL_TIMEOUT", "15"))
+STUCK_CALL_LIMIT = int(os.environ.get("STUCK_CALL_LIMIT", "3"))
+TOPIC_TIMEOUT = float(os.environ.get("TOPIC_TIMEOUT", "900"))
+
+# 常驻模式（python main.py --daemon）：任务间隔 / 随机抖动 / 健康检查间隔 / 浏览器定期重启（秒）
+DAEMON_INTERVAL = float(os.environ.get("DAEMON_INTERVAL", str(6 * 3600)))
+DAEMON_JITTER = float(os.environ.get("DAEMON_JITTER", "1800"))
+DAEMON_HEALTH_INTERVAL = float(os.environ.get("DAEMON_HEALTH_INTERVAL", "1800"))
+BROWSER_MAX_AGE = float(os.environ.get("BROWSER_MAX_AGE", str(24 * 3600)))
+
+# 性能剖析（默认关闭）：PROFILE_DIR 非空即开启
+# 采样 run 期间主线程调用栈 => collapsed-stack 火焰图文件；tracemalloc 快照 => 内存分配 Top 报告
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "").strip()
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.01"))
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "15"))
+# tracemalloc 单独开关：它会让纯 Python 代码慢数十倍，和 CPU 火焰图一起开会把火焰图测成 tracemalloc 的开销
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY", "false").strip().lower() not in [
+    "false",
+    "0",
+    "off",
+]
+PROFILE_TRACE_DEPTH = int(os.environ.get("PROFILE_TRACE_DEPTH", "1"))
+
+# 结构化事件日志（JSON lines，后台线程写入）：EVENT_LOG_FILE 非空即开启
+EVENT_LOG_FILE = os.environ.get("EVENT_LOG_FILE", "").strip()
+EVENT_LOG_LEVEL = os.environ.get("EVENT_LOG_LEVEL", "INFO").strip().upper()
+# 滚动循环的 loop 事件：每 N 次（以及计页/接近底部时）记为 INFO，其余为 DEBUG
+EVENT_LOOP_SAMPLE = int(os.environ.get("EVENT_LOOP_SAMPLE", "10"))
+
+# 调试：控制台输出每轮滚动/阅读细节；失败时抓取 page.html 片段（需要额外一次 CDP 取整页 HTML）
+DEBUG = os.environ.get("DEBUG", "false").strip().lower() not in ["false", "0", "off"]
+
 # Chrome 路径（Actions 下建议用 /usr/bin/google-chrome）
 CHROME_PATH = os.environ.get("CHROME_PATH", "/usr/bin/google-chrome")
 
@@ -116,85 +202,1241 @@ LIST_URL = "https://linux.do/latest"
 HOME_FOR_COOKIE = "https://linux.do/"
 LOGIN_URL = "https://linux.do/login"
 SESSION_URL = "https://linux.do/session"
+CURRENT_SESSION_URL = "https://linux.do/session/current.json"
+UNREAD_URL = "https://linux.do/unread.json"
+NEW_URL = "https://linux.do/new.json"
+
+# connect 要求表里与浏览相关的行（项目名关键字）
+CONNECT_TOPICS_KEY = "浏览的话题"
+CONNECT_POSTS_KEY = "已读帖子"
 CSRF_URL = "https://linux.do/session/csrf"
 
 # 你提供的帖子结构关键选择器（用于确认评论/回复已渲染）
 POST_CONTENT_CSS = "div.post__regular.regular.post__contents.contents"
 
 
-def _rand_port():
-    # 避免 9222 冲突：随机选一个高位端口
-    return random.randint(20000, 45000)
+# 低渲染开销模式下追加的 Chrome 参数
+LOW_COST_RENDER_ARGS = [
+    "--disable-smooth-scrolling",
+    "--force-prefers-reduced-motion",
+    "--disable-threaded-animation",
+    "--disable-threaded-scrolling",
+    "--disable-checker-imaging",
+    "--disable-image-animation-resync",
+    "--num-raster-threads=1",
+    "--force-device-scale-factor=1",
+    "--disable-features=PaintHolding,Translate,MediaRouter,OptimizationHints",  # 启动时与基础参数合并
+    "--mute-audio",
+]
 
+# 低渲染开销模式下每个 tab 在文档创建时注入：去掉 CSS 动画/过渡/平滑滚动
+# （Chrome 没有稳定的帧率上限参数；页面静止时合成器不出帧，去掉动画即去掉大部分帧）
+LOW_COST_INIT_JS = r"""
+(() => {
+  const css = '*,*::before,*::after{animation:none!important;transition:none!important;'
+    + 'scroll-behavior:auto!important;caret-color:transparent!important}';
+  const add = () => {
+    if (document.getElementById('__linuxdo_low_cost')) return;
+    const s = document.createElement('style');
+    s.id = '__linuxdo_low_cost';
+    s.textContent = css;
+    (document.head || document.documentElement).appendChild(s);
+  };
+  if (document.documentElement) add();
+  else document.addEventListener('DOMContentLoaded', add);
+})();
+"""
 
-class LinuxDoBrowser:
-    def __init__(self) -> None:
-        from sys import platform
 
-        if platform.startswith("linux"):
-            platformIdentifier = "X11; Linux x86_64"
-        elif platform == "darwin":
-            platformIdentifier = "Macintosh; Intel Mac OS X 10_15_7"
-        elif platform == "win32":
-            platformIdentifier = "Windows NT 10.0; Win64; x64"
+# ----------------------------
+# Checkpoint
+# ----------------------------
+class RunCheckpoint:
+    """
+    断点文件（JSON）：
+    - cookies: 登录会话（CHECKPOINT_SESSION=false 时不保存）
+    - topics / done: 本轮选中的话题 & 已完成的话题
+    - current: 正在浏览的话题及已计页数、最大楼层号
+    - completed: 本轮已完成（保留文件而不是删除：缓存里最新的一份覆盖旧的中断断点）
+    """
+
+    def __init__(self, path=CHECKPOINT_FILE, ttl=CHECKPOINT_TTL, enabled=CHECKPOINT_ENABLED):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.enabled = enabled
+        self.data = {}
+
+    def load(self) -> bool:
+        self.data = {}
+        if not self.enabled or not self.path.exists():
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"断点文件读取失败，忽略: {e}")
+            return False
+        if data.get("username") != USERNAME:
+            return False
+        age = time.time() - float(data.get("saved_at") or 0)
+        if age > self.ttl:
+            logger.info(f"断点已过期（{age:.0f}s > {self.ttl:.0f}s），从头开始")
+            self.clear()
+            return False
+        if data.get("completed"):
+            # 上一轮已完成：没有进度可续，只保留会话供 resume_session 复用
+            self.data = {"cookies": data["cookies"]} if data.get("cookies") else {}
+            return False
+        self.data = data
+        logger.info(
+            f"发现断点（{age:.0f}s 前）：话题 {len(self.done_topics)}/{len(self.topics)} 已完成，"
+            f"当前={self.current.get('url')} 已计 {self.current.get('pages_done', 0)} 页"
+        )
+        return True
+
+    def save(self):
+        if not self.enabled:
+            return
+        self.data["username"] = USERNAME
+        self.data["saved_at"] = time.time()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"断点写入失败: {e}")
+
+    def clear(self):
+        self.data = {}
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"断点删除失败: {e}")
+
+    @property
+    def cookies(self) -> dict:
+        return self.data.get("cookies") or {}
+
+    @property
+    def topics(self) -> list:
+        return self.data.get("topics") or []
+
+    @property
+    def done_topics(self) -> list:
+        return self.data.get("done") or []
+
+    @property
+    def current(self) -> dict:
+        return self.data.get("current") or {}
+
+    def complete(self):
+        """本轮完成：清空话题进度，写一份 completed 断点"""
+        cookies = self.cookies
+        self.data = {"completed": True, "topics": [], "done": []}
+        if CHECKPOINT_SESSION and cookies:
+            self.data["cookies"] = cookies
+        self.save()
+
+    def save_session(self, cookies: dict):
+        if CHECKPOINT_SESSION:
+            self.data["cookies"] = cookies
+            self.save()
+
+    def start_topics(self, topics):
+        self.data["topics"] = list(topics)
+        self.data["done"] = []
+        self.data.pop("current", None)
+        self.save()
+
+    def save_page(self, url, pages_done, target_pages, max_no):
+        self.data["current"] = {
+            "url": url,
+            "pages_done": pages_done,
+            "target_pages": target_pages,
+            "max_no": max_no,
+        }
+        self.save()
+
+    def finish_topic(self, url):
+        done = self.done_topics
+        if url not in done:
+            done.append(url)
+        self.data["done"] = done
+        self.data.pop("current", None)
+        self.save()
+
+
+def _merge_switches(arguments, names=("--disable-features", "--enable-features")):
+    """同名的逗号列表开关只有最后一个生效：合并成一个（保持首次出现的位置）"""
+    merged, values = [], {}
+    for arg in arguments:
+        key, sep, value = arg.partition("=")
+        if sep and key in names:
+            if key not in values:
+                values[key] = []
+                merged.append(key)
+            values[key].extend(v for v in value.split(",") if v and v not in values[key])
         else:
-            platformIdentifier = "X11; Linux x86_64"
+            merged.append(arg)
+    return [f"{a}={','.join(values[a])}" if a in values else a for a in merged]
+
+
+def _topic_url_at(topic_url, post_no):
+    """/t/slug/123 或 /t/slug/123/45 => /t/slug/123/{post_no}（Discourse 直接定位到楼层）"""
+    m = re.match(r"^(https?://[^/]+/t/[^/]+/\d+)(?:/\d+)?/?$", topic_url)
+    if not m or post_no <= 1:
+        return topic_url
+    return f"{m.group(1)}/{post_no}"
+
+
+# ----------------------------
+# Browser drivers
+# ----------------------------
+# LinuxDoBrowser 只通过下面这层接口操作浏览器：
+#   driver: launch / new_tab / quit / process_id
+#   tab:    get / run_js / run_js_many / ele / eles / wait_ele / set_cookies / get_cookies / add_init_js / url / html / close
+#           get_cookies(urls)：这些 URL 可见的 Cookie（CDP Network.getCookies 格式：name/value/domain/...）
+#           listen_network(handler)：开启 Network 域，NETWORK_EVENTS 里的事件回调 handler(method, params)
+#   element: attr / click
+# run_js 的语义与 DrissionPage 一致：脚本按函数体执行，可以 return，参数通过 arguments[i] 传入
+# run_js / run_js_many 的 timeout：单次调用最多等待的秒数，超时抛异常
+
+
+NETWORK_EVENTS = (
+    "Network.requestWillBeSent",
+    "Network.responseReceived",
+    "Network.loadingFinished",
+    "Network.loadingFailed",
+)
 
-        # ✅ 每次运行独立 user-data-dir，避免 Actions 并发/残留导致端口或 profile 冲突
-        self._profile_dir = Path(tempfile.mkdtemp(prefix="linuxdo_profile_")).resolve()
-        self._debug_port = _rand_port()
 
-        co = ChromiumOptions().incognito(True)
+class DrissionPageTab:
+    def __init__(self, tab):
+        self.raw = tab
+
+    @property
+    def url(self):
+        return self.raw.url
+
+    @property
+    def html(self):
+        return self.raw.html
+
+    def get(self, url):
+        return self.raw.get(url)
+
+    def run_js(self, js, *args, timeout=None):
+        return self.raw.run_js(js, *args, timeout=timeout)
+
+    def run_js_many(self, calls, timeout=None):
+        # DrissionPage 每次调用都要等回包：只能逐个执行
+        return [self.raw.run_js(js, *args, timeout=timeout) for js, args in calls]
+
+    def ele(self, css, timeout=None):
+        e = self.raw.ele(f"css:{css}", timeout=timeout)
+        return e if e else None
+
+    def eles(self, css, timeout=None):
+        return self.raw.eles(f"css:{css}", timeout=timeout)
+
+    def wait_ele(self, css, timeout=10) -> bool:
+        # DrissionPage 版本不同方法名可能不同：做兼容
+        if hasattr(self.raw.wait, "eles_loaded"):
+            return bool(self.raw.wait.eles_loaded(f"css:{css}", timeout=timeout))
+        return self.ele(css, timeout=timeout) is not None
+
+    def set_cookies(self, cookies):
+        self.raw.set.cookies(cookies)
+
+    def get_cookies(self, urls):
+        return self.raw.run_cdp("Network.getCookies", urls=list(urls)).get("cookies") or []
+
+    def add_init_js(self, js):
+        if hasattr(self.raw, "add_init_js"):
+            return self.raw.add_init_js(js)
+
+    def listen_network(self, handler):
+        # DrissionPage 的事件线程调用回调时不捕获异常：抛出即杀掉该 tab 的事件线程（页面加载跟踪也跟着失效）
+        def callback(_m, params):
+            try:
+                handler(_m, params)
+            except Exception:
+                pass
+
+        for method in NETWORK_EVENTS:
+            self.raw.driver.set_callback(method, lambda _m=method, **params: callback(_m, params))
+        self.raw.run_cdp("Network.enable")
+
+    def close(self):
+        self.raw.close()
+
+
+class DrissionPageDriver:
+    name = "drissionpage"
+
+    def __init__(self):
+        self.browser = None
+
+    def launch(self, browser_path, port, headless, user_agent, arguments):
+        co = ChromiumOptions()
 
         # ✅ 指定 Chrome 路径（Actions 很关键）
         # DrissionPage 版本不同方法名可能不同：做兼容
         if hasattr(co, "set_browser_path"):
-            co.set_browser_path(CHROME_PATH)
+            co.set_browser_path(browser_path)
         elif hasattr(co, "set_paths"):
             try:
-                co.set_paths(browser_path=CHROME_PATH)
+                co.set_paths(browser_path=browser_path)
             except Exception:
                 pass
 
-        # ✅ user-data-dir + remote-debugging-port：彻底绕开 9222 冲突
-        co.set_argument(f"--user-data-dir={str(self._profile_dir)}")
-        co.set_argument(f"--remote-debugging-port={self._debug_port}")
-
-        # Linux Actions 常用参数
-        co.set_argument("--no-sandbox")
-        co.set_argument("--disable-dev-shm-usage")
-        co.set_argument("--disable-gpu")
+        # 带值参数按 key=value 设置：同名的默认参数（如 --disable-features）被替换而不是并存
+        for arg in arguments:
+            key, sep, value = arg.partition("=")
+            co.set_argument(key, value if sep else None)
 
-        # ✅ HEADLESS=false + Xvfb：更像“真实浏览器”
         # DrissionPage 的 headless(True/False) 语义：True=无头
-        # 我们用 env HEADLESS=false => 这里 headless(False)
-        co.headless(HEADLESS)
-
-        # 尽量避免后台节流（有助于前端自己触发 /topics/timings）
-        co.set_argument("--disable-background-timer-throttling")
-        co.set_argument("--disable-backgrounding-occluded-windows")
-        co.set_argument("--disable-renderer-backgrounding")
-
-        co.set_user_agent(
-            f"Mozilla/5.0 ({platformIdentifier}) AppleWebKit/537.36 (KHTML, like Gecko) "
-            f"Chrome/130.0.0.0 Safari/537.36"
-        )
+        co.headless(headless)
+        co.set_user_agent(user_agent)
 
         # ✅ 关键：显式告诉 DrissionPage 连接的端口（不同版本方法名不同）
         if hasattr(co, "set_local_port"):
-            co.set_local_port(self._debug_port)
+            co.set_local_port(port)
         elif hasattr(co, "set_port"):
             try:
-                co.set_port(self._debug_port)
+                co.set_port(port)
             except Exception:
                 pass
 
-        logger.info(f"Chrome: path={CHROME_PATH}, headless={HEADLESS}, port={self._debug_port}")
-        logger.info(f"Chrome profile: {self._profile_dir}")
-
-        # ✅ 启动浏览器
         self.browser = Chromium(co)
-        self.page = self.browser.new_tab()
+
+    @property
+    def process_id(self):
+        return self.browser.process_id
+
+    def new_tab(self):
+        return DrissionPageTab(self.browser.new_tab())
+
+    def quit(self):
+        self.browser.quit()
+
+
+class _CdpWaiter:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CdpConnection:
+    """
+    到浏览器级 endpoint 的单条 websocket：
+    - 页面命令带 sessionId（Target.attachToTarget flatten 模式）复用同一连接
+    - send_async 只发不等，配合 wait 实现流水线；send_many 一次发出一批再统一收包
+    """
+
+    def __init__(self, ws_url, timeout=30):
+        self.timeout = timeout
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._ws.settimeout(None)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending = {}
+        self._handlers = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._recv_loop, daemon=True)
+        self._reader.start()
+
+    def _recv_loop(self):
+        while not self._closed:
+            try:
+                raw = self._ws.recv()
+            except Exception:
+                break
+            if not raw:
+                continue
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
+            if "id" not in msg:
+                handler = self._handlers.get(msg.get("sessionId"), {}).get(msg.get("method"))
+                if handler:
+                    try:
+                        handler(msg.get("method"), msg.get("params") or {})
+                    except Exception:
+                        pass
+                continue
+            waiter = self._pending.pop(msg["id"], None)
+            if waiter is None:
+                continue
+            if "error" in msg:
+                waiter.error = msg["error"]
+            else:
+                waiter.result = msg.get("result") or {}
+            waiter.event.set()
+
+        self._closed = True
+        for waiter in list(self._pending.values()):
+            waiter.error = {"message": "CDP connection closed"}
+            waiter.event.set()
+        self._pending.clear()
+
+    def on(self, session_id, method, handler):
+        """事件回调在收包线程里执行：handler 里不能再同步 send"""
+        self._handlers.setdefault(session_id, {})[method] = handler
+
+    def off(self, session_id):
+        self._handlers.pop(session_id, None)
+
+    def send_async(self, method, params=None, session_id=None) -> _CdpWaiter:
+        waiter = _CdpWaiter()
+        if self._closed:
+            waiter.error = {"message": "CDP connection closed"}
+            waiter.event.set()
+            return waiter
+        msg = {"method": method, "params": params or {}}
+        if session_id:
+            msg["sessionId"] = session_id
+        with self._lock:
+            self._next_id += 1
+            msg["id"] = self._next_id
+            self._pending[msg["id"]] = waiter
+            self._ws.send(json.dumps(msg))
+        return waiter
+
+    def wait(self, waiter, timeout=None) -> dict:
+        if not waiter.event.wait(self.timeout if timeout is None else timeout):
+            raise TimeoutError("CDP 命令超时")
+        if waiter.error is not None:
+            raise RuntimeError(f"CDP error: {waiter.error.get('message')}")
+        return waiter.result
+
+    def send(self, method, params=None, session_id=None, timeout=None) -> dict:
+        return self.wait(self.send_async(method, params, session_id), timeout)
+
+    def send_many(self, calls, session_id=None, timeout=None) -> list:
+        waiters = [self.send_async(method, params, session_id) for method, params in calls]
+        return [self.wait(w, timeout) for w in waiters]
+
+    def close(self):
+        self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+def _cdp_js_call(js, args):
+    return {
+        "expression": f"(function(){{{js}\n}}).apply(null, {json.dumps(list(args))})",
+        "returnByValue": True,
+    }
+
+
+def _cdp_value(res):
+    if res.get("exceptionDetails"):
+        detail = res["exceptionDetails"]
+        text = (detail.get("exception") or {}).get("description") or detail.get("text")
+        raise RuntimeError(f"JS error: {text}")
+    return (res.get("result") or {}).get("value")
+
+
+class _CdpObjectGroup:
+    """
+    一次查询在页面里创建的远端对象（数组 + 各元素）放在同一个 objectGroup：
+    最后一个引用它的 CdpElement 被回收时登记到 tab 的待释放列表，下次查询前统一 releaseObjectGroup
+    （__del__ 里不直接发命令：可能在持有连接锁的线程里触发）
+    """
+
+    _seq = itertools.count(1)
+
+    def __init__(self, stale):
+        self.name = f"q{next(self._seq)}"
+        self._stale = stale
+
+    def __del__(self):
+        self._stale.append(self.name)
+
+
+class CdpElement:
+    def __init__(self, tab, object_id, group=None):
+        self._tab = tab
+        self._object_id = object_id
+        self._group = group
+
+    def _call(self, fn, *args):
+        res = self._tab._cmd(
+            "Runtime.callFunctionOn",
+            objectId=self._object_id,
+            functionDeclaration=fn,
+            arguments=[{"value": a} for a in args],
+            returnByValue=True,
+        )
+        return _cdp_value(res)
+
+    def attr(self, name):
+        return self._call("function(n){ return this.getAttribute(n); }", name)
+
+    def click(self):
+        self._call("function(){ this.scrollIntoView({block:'center'}); this.click(); }")
+
+
+class CdpTab:
+    def __init__(self, driver, target_id, session_id):
+        self._driver = driver
+        self._conn = driver.conn
+        self.target_id = target_id
+        self.session_id = session_id
+        self._stale_groups = []
+
+    def _cmd(self, method, timeout=None, **params):
+        return self._conn.send(method, params, self.session_id, timeout)
+
+    @property
+    def url(self):
+        return self.run_js("return location.href;")
+
+    @property
+    def html(self):
+        return self.run_js("return document.documentElement ? document.documentElement.outerHTML : '';")
+
+    def get(self, url, timeout=30):
+        # 导航前在旧文档打标记：标记消失 + readyState=complete 即新文档加载完成
+        try:
+            self.run_js("window.__cdp_nav = 1;")
+        except Exception:
+            pass
+        self._cmd("Page.navigate", url=url)
+        end = time.time() + timeout
+        while time.time() < end:
+            try:
+                if self.run_js("return !window.__cdp_nav && document.readyState === 'complete';"):
+                    return True
+            except Exception:
+                pass
+            time.sleep(0.1)
+        return False
+
+    def run_js(self, js, *args, timeout=None):
+        return _cdp_value(self._cmd("Runtime.evaluate", timeout=timeout, **_cdp_js_call(js, args)))
+
+    def run_js_many(self, calls, timeout=None):
+        results = self._conn.send_many(
+            [("Runtime.evaluate", _cdp_js_call(js, args)) for js, args in calls],
+            session_id=self.session_id,
+            timeout=timeout,
+        )
+        return [_cdp_value(res) for res in results]
+
+    def _release_stale(self):
+        while self._stale_groups:
+            name = self._stale_groups.pop()
+            try:
+                self._conn.send_async("Runtime.releaseObjectGroup", {"objectGroup": name}, self.session_id)
+            except Exception:
+                pass
+
+    def _query(self, css):
+        # 轮询时每次都会新建远端对象：先释放已不再引用的上几次查询
+        self._release_stale()
+        group = _CdpObjectGroup(self._stale_groups)
+        res = self._cmd(
+            "Runtime.evaluate",
+            expression=f"Array.from(document.querySelectorAll({json.dumps(css)}))",
+            objectGroup=group.name,
+        )
+        array_id = (res.get("result") or {}).get("objectId")
+        if not array_id:
+            return []
+        # getProperties 返回的元素对象与数组同属一个 objectGroup
+        props = self._cmd("Runtime.getProperties", objectId=array_id, ownProperties=True)
+        items = [
+            (int(p["name"]), p["value"]["objectId"])
+            for p in props.get("result") or []
+            if p.get("name", "").isdigit() and (p.get("value") or {}).get("objectId")
+        ]
+        return [CdpElement(self, oid, group) for _, oid in sorted(items)]
+
+    def _poll(self, css, timeout):
+        end = time.time() + (timeout or 0)
+        while True:
+            found = self._query(css)
+            if found or time.time() >= end:
+                return found
+            time.sleep(0.2)
+
+    def ele(self, css, timeout=None):
+        found = self._poll(css, timeout)
+        return found[0] if found else None
+
+    def eles(self, css, timeout=None):
+        return self._poll(css, timeout)
+
+    def wait_ele(self, css, timeout=10) -> bool:
+        return bool(self._poll(css, timeout))
+
+    def set_cookies(self, cookies):
+        self._cmd("Network.setCookies", cookies=cookies)
+
+    def get_cookies(self, urls):
+        return self._cmd("Network.getCookies", urls=list(urls)).get("cookies") or []
+
+    def add_init_js(self, js):
+        return self._cmd("Page.addScriptToEvaluateOnNewDocument", source=js).get("identifier")
+
+    def listen_network(self, handler):
+        for method in NETWORK_EVENTS:
+            self._conn.on(self.session_id, method, handler)
+        self._cmd("Network.enable")
+
+    def close(self):
+        self._conn.off(self.session_id)
+        self._conn.send("Target.closeTarget", {"targetId": self.target_id})
+
+
+class CdpDriver:
+    name = "cdp"
+
+    def __init__(self):
+        self.proc = None
+        self.conn = None
+
+    def launch(self, browser_path, port, headless, user_agent, arguments):
+        cmd = [browser_path] + list(arguments) + [f"--user-agent={user_agent}"]
+        if headless:
+            cmd.append("--headless=new")
+        cmd.append("about:blank")
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        end = time.time() + 30
+        while True:
+            try:
+                with opener.open(f"http://127.0.0.1:{port}/json/version", timeout=2) as resp:
+                    ws_url = json.loads(resp.read())["webSocketDebuggerUrl"]
+                break
+            except Exception:
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"Chrome 启动失败，退出码 {self.proc.returncode}")
+                if time.time() >= end:
+                    self.quit()
+                    raise RuntimeError(f"等待 Chrome 调试端口 {port} 超时")
+                time.sleep(0.2)
+
+        self.conn = CdpConnection(ws_url)
+
+    @property
+    def process_id(self):
+        return self.proc.pid if self.proc else None
+
+    def new_tab(self):
+        target_id = self.conn.send("Target.createTarget", {"url": "about:blank"})["targetId"]
+        session_id = self.conn.send(
+            "Target.attachToTarget", {"targetId": target_id, "flatten": True}
+        )["sessionId"]
+        return CdpTab(self, target_id, session_id)
+
+    def quit(self):
+        if self.conn:
+            try:
+                self.conn.send("Browser.close", timeout=5)
+            except Exception:
+                pass
+            self.conn.close()
+        if self.proc:
+            try:
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+
+
+BROWSER_DRIVERS = {
+    DrissionPageDriver.name: DrissionPageDriver,
+    CdpDriver.name: CdpDriver,
+}
+
+
+# ----------------------------
+# Watchdog
+# ----------------------------
+class TabStuckError(RuntimeError):
+    """tab 卡死（JS 调用连续超时 / 存活探测失败）或话题超出总时限"""
+
+    def __init__(self, reason, deadline=False):
+        super().__init__(reason)
+        self.reason = reason
+        self.deadline = deadline
+
+
+def _call_with_timeout(seconds, fn, *args, **kwargs):
+    """驱动本身不带超时的调用（元素操作 / 关 tab）：放到后台线程，最多等 seconds 秒"""
+    box = {}
+
+    def target():
+        try:
+            box["res"] = fn(*args, **kwargs)
+        except BaseException as e:
+            box["err"] = e
+
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(seconds)
+    if t.is_alive():
+        raise TimeoutError(f"调用超时 {seconds:.1f}s")
+    if "err" in box:
+        raise box["err"]
+    return box.get("res")
+
+
+class WatchdogElement:
+    """元素操作同样走看门狗：计入超时/卡死判定"""
+
+    def __init__(self, ele, watchdog):
+        self.ele = ele
+        self._watchdog = watchdog
+
+    def attr(self, name):
+        return self._watchdog._bounded(self.ele.attr, name)
+
+    def click(self):
+        return self._watchdog._bounded(self.ele.click)
+
+
+class WatchdogTab:
+    """
+    包一层 driver tab：
+    - 每次 run_js / run_js_many 带 JS_CALL_TIMEOUT，超时后做一次存活探测，
+      探测失败或连续超时 STUCK_CALL_LIMIT 次 => 判定卡死
+    - 元素查找 / 元素操作 / 关 tab 驱动不带超时：放到后台线程限时，同样计入判定
+    - deadline：话题总时限，过期即判定超时
+    判定后所有调用立即抛 TabStuckError；各循环开头调用 check()，
+    保证异常能越过 helper 里的 try/except 冒泡到 click_one_topic
+    """
+
+    def __init__(self, tab, call_timeout=JS_CALL_TIMEOUT, deadline=None):
+        self.tab = tab
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.stuck = None
+        self._timeouts = 0
+        # 话题 tab 上挂的 ReadTimingsTracker（没有则回退到 DOM read-state 轮询）
+        self.read_tracker = None
+
+    def __getattr__(self, name):
+        return getattr(self.tab, name)
+
+    def check(self):
+        if self.stuck:
+            raise self.stuck
+        if self.deadline and time.time() > self.deadline:
+            self.stuck = TabStuckError(f"话题超出总时限 {TOPIC_TIMEOUT:.0f}s", deadline=True)
+            raise self.stuck
+
+    def _alive(self) -> bool:
+        try:
+            return self.tab.run_js("return 1;", timeout=min(3.0, self.call_timeout)) == 1
+        except Exception:
+            return False
+
+    def _guarded(self, fn, *args, limit=None, **kwargs):
+        self.check()
+        limit = self.call_timeout if limit is None else limit
+        t0 = time.perf_counter()
+        try:
+            res = fn(*args, **kwargs)
+        except Exception:
+            elapsed = time.perf_counter() - t0
+            if elapsed >= limit * 0.95:
+                self._timeouts += 1
+                if self._timeouts >= STUCK_CALL_LIMIT or not self._alive():
+                    self.stuck = TabStuckError(
+                        f"调用超时 {elapsed:.1f}s（连续 {self._timeouts} 次），tab 无响应"
+                    )
+                    raise self.stuck
+            raise
+        self._timeouts = 0
+        return res
+
+    def run_js(self, js, *args):
+        return self._guarded(self.tab.run_js, js, *args, timeout=self.call_timeout)
+
+    def run_js_many(self, calls):
+        return self._guarded(self.tab.run_js_many, calls, timeout=self.call_timeout)
+
+    def get(self, url):
+        self.check()
+        return self.tab.get(url)
+
+    def _bounded(self, fn, *args, limit=None, **kwargs):
+        limit = self.call_timeout if limit is None else limit
+        return self._guarded(_call_with_timeout, limit, fn, *args, limit=limit, **kwargs)
+
+    def ele(self, css, timeout=None):
+        # 查找本身会等元素出现（DrissionPage 默认最多 10s）：限时 = 等待时间 + 单次调用超时
+        limit = (10 if timeout is None else timeout) + self.call_timeout
+        e = self._bounded(self.tab.ele, css, timeout=timeout, limit=limit)
+        return WatchdogElement(e, self) if e else None
+
+    def eles(self, css, timeout=None):
+        limit = (10 if timeout is None else timeout) + self.call_timeout
+        return [WatchdogElement(e, self) for e in self._bounded(self.tab.eles, css, timeout=timeout, limit=limit)]
+
+    def close(self):
+        # DrissionPage 关 tab 会一直等到 Chrome 移除该 tab（不限时）
+        _call_with_timeout(self.call_timeout, self.tab.close)
+
+
+def _connect_number(text):
+    """connect 表格里的数值："1,234" / "35%" / "12 / 50" => 取第一个数"""
+    m = re.search(r"-?\d+(?:\.\d+)?", (text or "").replace(",", ""))
+    return float(m.group(0)) if m else None
+
+
+def _connect_gap(info, key):
+    """要求 - 当前（同名多行取最大缺口）；表里没有该行返回 None"""
+    gap = None
+    for project, current, requirement in info:
+        if key not in project:
+            continue
+        cur, req = _connect_number(current), _connect_number(requirement)
+        if cur is None or req is None:
+            continue
+        gap = max(gap or 0, req - cur, 0)
+    return gap
+
+
+def build_workload_plan(connect_info, unread):
+    """
+    connect_info: print_connect_info 解析出的 [项目, 当前, 要求]
+    unread: 未读 + 新话题数（None 表示未知）
+    返回 {"fast_path", "reason", "topics", "min_pages", "max_pages"}
+    """
+    plan = {
+        "fast_path": False,
+        "reason": "无法判断缺口，按配置上限",
+        "topics": MAX_TOPICS,
+        "min_pages": MIN_COMMENT_PAGES,
+        "max_pages": MAX_COMMENT_PAGES,
+    }
+    topics_gap = _connect_gap(connect_info, CONNECT_TOPICS_KEY)
+    posts_gap = _connect_gap(connect_info, CONNECT_POSTS_KEY)
+
+    if topics_gap == 0 and posts_gap == 0:
+        plan.update(fast_path=True, reason="浏览话题/已读帖子均已达标")
+        return plan
+    if unread == 0:
+        plan.update(fast_path=True, reason="没有未读/新话题")
+        return plan
+
+    reasons = []
+    topics = MAX_TOPICS
+    if topics_gap:
+        topics = min(topics, int(math.ceil(topics_gap)))
+        reasons.append(f"浏览话题缺 {topics_gap:.0f}")
+    if unread:
+        topics = min(topics, unread)
+        reasons.append(f"未读/新话题 {unread}")
+    plan["topics"] = max(1, topics)
+
+    if posts_gap == 0:
+        # 已读帖子已达标：每个话题只需最少量浏览
+        plan["min_pages"] = plan["max_pages"] = 1
+        reasons.append("已读帖子已达标")
+    elif posts_gap:
+        pages = int(math.ceil(posts_gap / plan["topics"] / max(1, PAGE_GROW)))
+        pages = max(1, min(pages, MAX_COMMENT_PAGES))
+        plan["min_pages"] = min(MIN_COMMENT_PAGES, pages)
+        plan["max_pages"] = max(plan["min_pages"], pages)
+        reasons.append(f"已读帖子缺 {posts_gap:.0f}")
+
+    if reasons:
+        plan["reason"] = "，".join(reasons)
+    return plan
+
+
+# ----------------------------
+# Read timings
+# ----------------------------
+class ReadTimingsTracker:
+    """
+    监听 Discourse 前端上报阅读的 POST /topics/timings：
+    请求成功完成 => 服务端已记录请求体里 timings[N] 的楼层 N（比 DOM 蓝点更早也更准）
+    同时记录每个请求的耗时（Network 时间戳差）
+    请求体没有内联（hasPostData 但无 postData）时读 postDataEntries；都没有则只计数，由 DOM 判断兜底
+    """
+
+    URL_PART = "/topics/timings"
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._inflight = {}
+        self.confirmed = set()
+        self.latencies = []
+        self.failed = 0
+        self.bodyless = 0
+
+    @staticmethod
+    def _post_body(req) -> str:
+        if req.get("postData"):
+            return req["postData"]
+        parts = []
+        for entry in req.get("postDataEntries") or []:
+            try:
+                parts.append(base64.b64decode(entry.get("bytes") or "").decode("utf-8", "replace"))
+            except Exception:
+                pass
+        return "".join(parts)
+
+    def handle_event(self, method, params):
+        rid = params.get("requestId")
+        with self._cond:
+            if method == "Network.requestWillBeSent":
+                req = params.get("request") or {}
+                if self.URL_PART not in (req.get("url") or "") or req.get("method") != "POST":
+                    return
+                body = self._post_body(req)
+                if not body and req.get("hasPostData"):
+                    self.bodyless += 1
+                posts = {int(n) for n in re.findall(r"timings\[(\d+)\]", unquote(body))}
+                self._inflight[rid] = {"posts": posts, "start": params.get("timestamp"), "status": None}
+            elif rid not in self._inflight:
+                return
+            elif method == "Network.responseReceived":
+                self._inflight[rid]["status"] = (params.get("response") or {}).get("status")
+            elif method == "Network.loadingFinished":
+                item = self._inflight.pop(rid)
+                if item["status"] != 200:
+                    self.failed += 1
+                    return
+                if item["start"] is not None and params.get("timestamp") is not None:
+                    self.latencies.append(params["timestamp"] - item["start"])
+                self.confirmed |= item["posts"]
+                self._cond.notify_all()
+            elif method == "Network.loadingFailed":
+                self._inflight.pop(rid, None)
+                self.failed += 1
+
+    def is_confirmed(self, post_no) -> bool:
+        return post_no in self.confirmed
+
+    def wait_confirmed(self, post_no, timeout) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: post_no in self.confirmed, timeout=timeout)
+
+    def summary(self) -> str:
+        n = len(self.latencies)
+        bodyless = f"，{self.bodyless} 次读不到请求体" if self.bodyless else ""
+        if not n:
+            return f"/topics/timings 0 次成功（失败 {self.failed}{bodyless}）"
+        avg = sum(self.latencies) / n * 1000
+        return (
+            f"/topics/timings {n} 次成功（失败 {self.failed}{bodyless}），确认楼层 {len(self.confirmed)} 个，"
+            f"耗时 avg={avg:.0f}ms max={max(self.latencies) * 1000:.0f}ms"
+        )
+
+
+# ----------------------------
+# Profiler
+# ----------------------------
+class RunProfiler:
+    """
+    opt-in 剖析：
+    - 后台线程每 PROFILE_INTERVAL 秒采样一次目标线程的 Python 调用栈
+      wall.collapsed：按样本数计（含 sleep/等待）；cpu.collapsed：按两次采样间该线程的 CPU 微秒数计
+      （每行 "frame;frame;frame N"，flamegraph.pl / speedscope 可直接打开）
+    - tracemalloc（memory=True，即 PROFILE_MEMORY）：snapshot(label) 记录内存 Top 分配点及相对上一个快照的增长，
+      写入 tracemalloc.txt；开销很大，不要和 CPU 火焰图放在同一次运行里看
+    """
+
+    def __init__(
+        self, out_dir, interval=PROFILE_INTERVAL, top=PROFILE_TOP, label="run", memory=PROFILE_MEMORY
+    ):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.out_dir = Path(out_dir) / f"{label}-{stamp}"
+        self.interval = interval
+        self.top = top
+        self.memory = memory
+        self.wall = {}
+        self.cpu = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+        self._clock = None
+        self._last_snapshot = None
+        self._own_tracemalloc = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(PROFILE_DIR) if PROFILE_DIR else None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample_loop(self):
+        last_cpu = time.clock_gettime(self._clock) if self._clock is not None else None
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.wall[key] = self.wall.get(key, 0) + 1
+
+            if self._clock is not None:
+                try:
+                    now_cpu = time.clock_gettime(self._clock)
+                except OSError:
+                    continue
+                used = int((now_cpu - last_cpu) * 1_000_000)
+                last_cpu = now_cpu
+                if used > 0:
+                    self.cpu[key] = self.cpu.get(key, 0) + used
+
+    def start(self):
+        """开启剖析；输出目录建不了时只告警并返回 None（剖析是可选诊断，不能中断签到）"""
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            logger.warning(f"剖析输出目录不可用，关闭剖析: {e}")
+            return None
+        self._target = threading.get_ident()
+        try:
+            self._clock = time.pthread_getcpuclockid(self._target)
+        except (AttributeError, OSError):
+            # 非 Unix：只有 wall 采样
+            self._clock = None
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACE_DEPTH)
+            self._own_tracemalloc = True
+        self._thread = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"🔬 剖析已开启：interval={self.interval}s，tracemalloc={self.memory}，输出目录 {self.out_dir}"
+        )
+        return self
+
+    def snapshot(self, label):
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        snap = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"===== {label}  current={current / 1024:.0f}KiB peak={peak / 1024:.0f}KiB ====="]
+        lines.append("-- top allocation sites --")
+        lines += [str(stat) for stat in snap.statistics("lineno")[: self.top]]
+        if self._last_snapshot is not None:
+            lines.append("-- growth since previous snapshot --")
+            lines += [str(stat) for stat in snap.compare_to(self._last_snapshot, "lineno")[: self.top]]
+        self._last_snapshot = snap
+
+        report = "\n".join(lines)
+        logger.info(f"🔬 tracemalloc [{label}] current={current / 1024:.0f}KiB peak={peak / 1024:.0f}KiB")
+        try:
+            with open(self.out_dir / "tracemalloc.txt", "a", encoding="utf-8") as f:
+                f.write(report + "\n\n")
+        except Exception as e:
+            logger.warning(f"tracemalloc 报告写入失败，停止内存快照: {e}")
+            self.memory = False
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.snapshot("exit")
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+
+        for name, stacks in (("wall", self.wall), ("cpu", self.cpu)):
+            if not stacks:
+                continue
+            try:
+                with open(self.out_dir / f"{name}.collapsed", "w", encoding="utf-8") as f:
+                    for key, n in sorted(stacks.items(), key=lambda kv: -kv[1]):
+                        f.write(f"{key} {n}\n")
+            except Exception as e:
+                logger.warning(f"{name}.collapsed 写入失败: {e}")
+        logger.info(
+            f"🔬 剖析结束：{sum(self.wall.values())} 个样本，"
+            f"CPU {sum(self.cpu.values()) / 1_000_000:.2f}s，输出 {self.out_dir}"
+        )
+
+
+# ----------------------------
+# Event log
+# ----------------------------
+class PhaseEvent(NamedTuple):
+    phase: str  # login / plan / browse / topic / run
+    status: str  # ok / fail / skip / stuck
+    seconds: float = 0.0
+    detail: str = ""
+
+
+class LoopEvent(NamedTuple):
+    topic: str
+    loop: int
+    scroll: int
+    max_no: int
+    dom_posts: int
+    pages_done: int
+    near_bottom: bool
+
+
+class PageEvent(NamedTuple):
+    topic: str
+    page: int
+    target: int
+    from_no: int
+    to_no: int
+
+
+class ReadEvent(NamedTuple):
+    topic: str
+    post: int
+    stay: float
+    confirmed: bool
+    via: str  # timings / dom
+
+
+class HtmlEvent(NamedTuple):
+    where: str
+    url: str
+    html: str
+
+
+class EventLog:
+    """
+    结构化事件流：热路径上只构造 NamedTuple + 入队，不做格式化和 I/O；
+    后台线程把 {"ts", "level", "event", ...字段} 逐行写成 JSON
+    """
+
+    LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30}
+
+    def __init__(self, path=EVENT_LOG_FILE, level=EVENT_LOG_LEVEL, maxsize=10000):
+        self.path = path
+        self.enabled = bool(path)
+        self.min_level = self.LEVELS.get(level, 20)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+
+    def emit(self, record, level="INFO"):
+        if not self.enabled or self.LEVELS.get(level, 20) < self.min_level:
+            return
+        if self._thread is None and not self._start():
+            return
+        try:
+            self._queue.put_nowait((time.time(), level, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> bool:
+        # 在调用方线程里打开文件：打不开就关掉事件日志，而不是让写线程静默退出、队列一直堆到满
+        try:
+            path = Path(self.path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, "a", encoding="utf-8")
+        except Exception as e:
+            self.enabled = False
+            logger.warning(f"事件日志文件打不开，关闭事件日志: {e}")
+            return False
+        self._thread = threading.Thread(target=self._write_loop, args=(f,), name="event-log", daemon=True)
+        self._thread.start()
+        return True
+
+    def _write_loop(self, f):
+        try:
+            with f:
+                while True:
+                    item = self._queue.get()
+                    if item is None:
+                        break
+                    ts, level, record = item
+                    line = {"ts": round(ts, 3), "level": level, "event": type(record).__name__[:-5].lower()}
+                    line.update(record._asdict())
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    if self._queue.empty():
+                        f.flush()
+        except Exception as e:
+            self.enabled = False
+            logger.warning(f"事件日志写入失败，关闭事件日志: {e}")
+
+    def close(self):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=1)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=5)
+        self._thread = None
+        if self.dropped:
+            logger.warning(f"事件日志队列满，丢弃 {self.dropped} 条")
+
+
+events = EventLog()
+atexit.register(events.close)
+
+
+def _rand_port():
+    # 避免 9222 冲突：随机选一个高位端口
+    return random.randint(20000, 45000)
+
+
+class LinuxDoBrowser:
+    def __init__(self, low_cost_render=None, driver=None) -> None:
+        from sys import platform
+
+        if platform.startswith("linux"):
+            platformIdentifier = "X11; Linux x86_64"
+        elif platform == "darwin":
+            platformIdentifier = "Macintosh; Intel Mac OS X 10_15_7"
+        elif platform == "win32":
+            platformIdentifier = "Windows NT 10.0; Win64; x64"
+        else:
+            platformIdentifier = "X11; Linux x86_64"
+
+        # ✅ 每次运行独立 user-data-dir，避免 Actions 并发/残留导致端口或 profile 冲突
+        # （首次启动浏览器时才创建）
+        self._profile_dir = None
+        self.low_cost_render = LOW_COST_RENDER if low_cost_render is None else bool(low_cost_render)
+
+        self._user_agent = (
+            f"Mozilla/5.0 ({platformIdentifier}) AppleWebKit/537.36 (KHTML, like Gecko) "
+            f"Chrome/130.0.0.0 Safari/537.36"
+        )
+
+        self._driver_name = (driver or BROWSER_DRIVER).strip().lower()
+        if self._driver_name not in BROWSER_DRIVERS:
+            raise ValueError(
+                f"未知的 BROWSER_DRIVER={self._driver_name}，可选: {', '.join(BROWSER_DRIVERS)}"
+            )
+
+        # 浏览器按需启动：工作量预检走快速路径时整轮都不启动 Chrome
+        self.browser = None
+        self.page = None
+        self.browser_started_at = None
+
+        self.checkpoint = RunCheckpoint()
+        self.profiler = None
+        self.logged_in = False
+        self._reset_run_state()
 
         # requests 会话（用于登录 / connect info）
         self.session = requests.Session()
@@ -207,6 +1449,111 @@ class LinuxDoBrowser:
             }
         )
 
+    def _reset_run_state(self):
+        # 本次浏览量：默认取配置，工作量预检后可能收缩
+        self.max_topics = MAX_TOPICS
+        self.min_comment_pages = MIN_COMMENT_PAGES
+        self.max_comment_pages = MAX_COMMENT_PAGES
+        self.connect_info = []
+        # 工作量预检拿到的未读/新话题：非空时 click_topic 从中选话题
+        self.planned_topics = []
+
+        # 看门狗事件（卡死 tab / 话题超时），随通知一起上报
+        self.incidents = []
+        self._topic_deadlines = {}
+        # 当前话题（事件记录用）
+        self._topic = ""
+
+    # ----------------------------
+    # Browser lifecycle
+    # ----------------------------
+    def _ensure_browser(self):
+        if self.browser is None:
+            self._launch_browser()
+
+    def _launch_browser(self):
+        if self._profile_dir is None:
+            self._profile_dir = Path(tempfile.mkdtemp(prefix="linuxdo_profile_")).resolve()
+        self._debug_port = _rand_port()
+        arguments = [
+            "--incognito",
+            # ✅ user-data-dir + remote-debugging-port：彻底绕开 9222 冲突
+            f"--user-data-dir={str(self._profile_dir)}",
+            f"--remote-debugging-port={self._debug_port}",
+            # Linux Actions 常用参数
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            # DrissionPage 默认参数（configs.ini）：两个驱动后端用同一套，避免首次运行/默认浏览器提示等 UI
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-suggestions-ui",
+            "--disable-popup-blocking",
+            "--disable-infobars",
+            "--hide-crash-restore-bubble",
+            # 尽量避免后台节流（有助于前端自己触发 /topics/timings）
+            "--disable-background-timer-throttling",
+            "--disable-backgrounding-occluded-windows",
+            "--disable-renderer-backgrounding",
+            # 同属 DrissionPage 默认参数；与低渲染开销模式的 --disable-features 合并成一个
+            "--disable-features=PrivacySandboxSettings4",
+        ]
+        if self.low_cost_render:
+            arguments.append(f"--window-size={LOW_COST_WINDOW_SIZE}")
+            arguments.extend(LOW_COST_RENDER_ARGS)
+        arguments = _merge_switches(arguments)
+
+        logger.info(
+            f"Chrome: path={CHROME_PATH}, headless={HEADLESS}, port={self._debug_port}, "
+            f"driver={self._driver_name}, low_cost_render={self.low_cost_render}"
+        )
+        logger.info(f"Chrome profile: {self._profile_dir}")
+
+        # ✅ 启动浏览器
+        # ✅ HEADLESS=false + Xvfb：更像“真实浏览器”
+        self.browser = BROWSER_DRIVERS[self._driver_name]()
+        self.browser.launch(
+            browser_path=CHROME_PATH,
+            port=self._debug_port,
+            headless=HEADLESS,
+            user_agent=self._user_agent,
+            arguments=arguments,
+        )
+        self.page = self.new_tab()
+        self.browser_started_at = time.time()
+
+    def _quit_browser(self):
+        if self.browser is None:
+            return
+        try:
+            self.page.close()
+        except Exception:
+            pass
+        try:
+            self.browser.quit()
+        except Exception:
+            pass
+        self.browser = None
+        self.page = None
+
+    def relaunch_browser(self):
+        """重启浏览器，保留 profile 和 requests 会话"""
+        logger.info("重启浏览器...")
+        self._quit_browser()
+        self._launch_browser()
+
+    # ----------------------------
+    # Tabs
+    # ----------------------------
+    def new_tab(self, deadline=None):
+        tab = self.browser.new_tab()
+        if self.low_cost_render:
+            try:
+                tab.add_init_js(LOW_COST_INIT_JS)
+            except Exception:
+                pass
+        return WatchdogTab(tab, deadline=deadline)
+
     # ----------------------------
     # Headers
     # ----------------------------
@@ -305,46 +1652,148 @@ class LinuxDoBrowser:
             logger.error(f"登录请求异常: {e}")
             return False
 
+        self.logged_in = True
+        self.checkpoint.save_session(self.session.cookies.get_dict())
+        self.print_connect_info()
+        return True
+
+    def resume_session(self) -> bool:
+        """断点里的会话仍有效 => 跳过登录请求，直接同步 Cookie 进浏览器"""
+        cookies = self.checkpoint.cookies
+        if not cookies:
+            return False
+        for name, value in cookies.items():
+            self.session.cookies.set(name, value, domain=".linux.do")
+        if not self.session_valid():
+            logger.info("断点会话已失效，重新登录")
+            self.session.cookies.clear()
+            return False
+
+        logger.info("断点会话有效，跳过登录")
+        self.logged_in = True
         self.print_connect_info()
+        return True
 
-        logger.info("同步 Cookie 到 DrissionPage...")
+    def session_valid(self) -> bool:
+        try:
+            resp = self.session.get(
+                CURRENT_SESSION_URL,
+                headers=self._api_headers(),
+                impersonate="chrome136",
+                allow_redirects=True,
+                timeout=30,
+            )
+            return resp.status_code == 200 and bool((resp.json() or {}).get("current_user"))
+        except Exception as e:
+            logger.warning(f"会话校验异常: {e}")
+            return False
+
+    def _replace_list_tab(self, reason):
+        """列表页 tab 卡死：限时关掉，换一个新 tab（同话题 tab 的处理）"""
+        self.incidents.append(f"列表页: {reason}")
+        logger.error(f"🐶 看门狗：列表页 {reason}，关闭该 tab 并换新 tab 重试")
+        try:
+            self.page.close()
+        except Exception as e:
+            logger.warning(f"关闭列表页 tab 失败: {e}")
+        self.page = self.new_tab()
+
+    def _on_list_tab(self, fn, default=None):
+        """在列表页 tab 上执行 fn；tab 卡死时换新 tab 重试一次"""
+        for attempt in range(2):
+            try:
+                return fn()
+            except TabStuckError as e:
+                if attempt:
+                    self.incidents.append(f"列表页: {e.reason}")
+                    logger.error(f"🐶 看门狗：换新 tab 后列表页仍卡死（{e.reason}），放弃")
+                    return default
+                self._replace_list_tab(e.reason)
+        return default
+
+    def _enter_browser(self) -> bool:
+        self._ensure_browser()
+        return self._on_list_tab(self._open_list_page, default=False)
+
+    def _open_list_page(self) -> bool:
+        logger.info("同步 Cookie 到浏览器...")
         cookies_dict = self.session.cookies.get_dict()
-        dp_cookies = [
+        browser_cookies = [
             {"name": name, "value": value, "domain": ".linux.do", "path": "/"}
             for name, value in cookies_dict.items()
         ]
-        self.page.set.cookies(dp_cookies)
+        self.page.set_cookies(browser_cookies)
 
         logger.info("Cookie 设置完成，导航至主题列表页 /latest ...")
         self.page.get(LIST_URL)
 
         try:
-            self.page.wait.ele("@id=main-outlet", timeout=25)
+            ready = self.page.wait_ele("#main-outlet", timeout=25)
         except Exception:
+            ready = False
+        if not ready:
             logger.warning("未等到 main-outlet，但继续尝试查找 topic link")
 
         ok = self._wait_any_topic_link(timeout=35)
         if not ok:
             logger.warning("未等到主题链接 a.raw-topic-link")
             logger.warning(f"url={self.page.url}")
-            logger.warning((self.page.html or "")[:500])
+            self._dump_html(self.page, "enter_browser")
             return True
 
         logger.info("主题列表已渲染，登录&页面加载完成")
         return True
 
+    def _sync_cookies_from_browser(self):
+        """
+        浏览器里的 Cookie 写回 requests 会话（和断点）：
+        Discourse 在浏览器活跃时会轮换 _t，不写回的话常驻模式下 Python 会话的 token 会过期
+        """
+        if self.browser is None:
+            return
+        try:
+            cookies = self.page.get_cookies([HOME_FOR_COOKIE])
+        except Exception as e:
+            logger.warning(f"读取浏览器 Cookie 失败: {e}")
+            return
+        for c in cookies:
+            name, value = c.get("name"), c.get("value")
+            if not name or value is None:
+                continue
+            self.session.cookies.delete(name)
+            self.session.cookies.set(
+                name, value, domain=c.get("domain") or ".linux.do", path=c.get("path") or "/"
+            )
+        if cookies:
+            self.checkpoint.save_session(self.session.cookies.get_dict())
+
     def _wait_any_topic_link(self, timeout=30) -> bool:
         end = time.time() + timeout
         while time.time() < end:
             try:
-                links = self.page.eles("css:a.raw-topic-link")
+                links = self.page.eles("a.raw-topic-link")
                 if links and len(links) > 0:
                     return True
+            except TabStuckError:
+                # 卡死交给 _on_list_tab 换 tab，不要空等到超时
+                raise
             except Exception:
                 pass
             time.sleep(0.8)
         return False
 
+    def _dump_html(self, page, where):
+        """失败现场的 HTML 片段：只在 DEBUG 下抓取（要额外一次 CDP 取整页 HTML）"""
+        if not DEBUG:
+            return
+        try:
+            url, html = page.url, (page.html or "")[:500]
+        except Exception as e:
+            logger.debug(f"抓取 HTML 失败: {e}")
+            return
+        logger.debug(html)
+        events.emit(HtmlEvent(where, url, html), "WARNING")
+
     # ----------------------------
     # Topic/Posts helpers
     # ----------------------------
@@ -377,6 +1826,7 @@ class LinuxDoBrowser:
         """
         end = time.time() + timeout
         while time.time() < end:
+            page.check()
             try:
                 js = f"""
                 const posts = Array.from(document.querySelectorAll('[id^="post_"]'));
@@ -419,22 +1869,27 @@ class LinuxDoBrowser:
     # ----------------------------
     # Blue-dot / read-state helpers
     # ----------------------------
-    def _post_has_blue_dot(self, page, post_id: int) -> bool:
+    _BLUE_DOT_JS = r"""
+    const pid = arguments[0];
+    const root = document.querySelector(`#post_${pid}`);
+    if (!root) return false;
+    const rs = root.querySelector('.topic-meta-data .read-state');
+    if (!rs) return false;
+    return !rs.classList.contains('read');
+    """
+
+    def _posts_with_blue_dot(self, page, post_ids):
         """
-        蓝点判断：存在 .read-state 且不包含 class 'read' => 未读
+        批量蓝点判断：存在 .read-state 且不包含 class 'read' => 未读
+        cdp 后端一次发出全部查询再统一收包
         """
+        if not post_ids:
+            return []
         try:
-            js = r"""
-            const pid = arguments[0];
-            const root = document.querySelector(`#post_${pid}`);
-            if (!root) return false;
-            const rs = root.querySelector('.topic-meta-data .read-state');
-            if (!rs) return false;
-            return !rs.classList.contains('read');
-            """
-            return bool(page.run_js(js, post_id))
+            dots = page.run_js_many([(self._BLUE_DOT_JS, (pid,)) for pid in post_ids])
         except Exception:
-            return False
+            return []
+        return [pid for pid, dot in zip(post_ids, dots) if dot]
 
     def _post_is_read(self, page, post_id: int) -> bool:
         try:
@@ -476,13 +1931,17 @@ class LinuxDoBrowser:
     # ----------------------------
     # Human-like active stay (核心：让前端自己发 /topics/timings)
     # ----------------------------
-    def _active_stay(self, page, seconds: float):
+    def _active_stay(self, page, seconds: float, until=None):
         """
         不是纯 sleep：小步滚动 + 随机节奏 + focus/mousemove/scroll event
         目标：像真人一样，让 Discourse 前端自然触发 /topics/timings 计阅读
+        until：可选的提前结束条件
         """
         end = time.time() + seconds
         while time.time() < end:
+            page.check()
+            if until and until():
+                return
             step = random.randint(READ_STEP_MIN, READ_STEP_MAX)
             delay = random.uniform(READ_DELAY_MIN, READ_DELAY_MAX)
             try:
@@ -512,7 +1971,9 @@ class LinuxDoBrowser:
         只读未读（蓝点）楼层：
         - 滚到楼层中间
         - 停留 >= MIN_READ_STAY（停留期间持续触发 scroll/mousemove/focus）
-        - 最后检查 read-state.read 是否出现（不出现也不强求：以“触发timings”为主）
+        - 有 read_tracker 时以 /topics/timings 成功返回为确认信号：确认后不再额外停留，
+          等待期间 read-state.read 出现也算确认（请求体读不到 / URL 不匹配时的兜底）
+        - 没有 read_tracker 时只检查 read-state.read 是否出现（不出现也不强求：以“触发timings”为主）
         """
         try:
             page.run_js(
@@ -527,23 +1988,48 @@ class LinuxDoBrowser:
             pass
 
         stay = max(MIN_READ_STAY, random.uniform(MIN_READ_STAY, MIN_READ_STAY + 4.5))
-        logger.info(f"👀 阅读未读楼层 post_{post_id}（停留≈{stay:.1f}s）")
+        if DEBUG:
+            logger.debug(f"👀 阅读未读楼层 post_{post_id}（停留≈{stay:.1f}s）")
+
+        tracker = page.read_tracker
+        if tracker:
+            self._active_stay(page, MIN_READ_STAY)
+            self._active_stay(page, stay - MIN_READ_STAY, until=lambda: tracker.is_confirmed(post_id))
+
+            end = time.time() + READ_STATE_TIMEOUT
+            while time.time() < end:
+                page.check()
+                if tracker.wait_confirmed(post_id, timeout=min(0.6, max(0.0, end - time.time()))):
+                    return self._read_done(post_id, stay, True, "timings")
+                if self._post_is_read(page, post_id):
+                    return self._read_done(post_id, stay, True, "dom")
+
+            logger.warning(
+                f"⚠️ post_{post_id} 停留已达阈值但未等到 /topics/timings 确认且蓝点未消失（可能风控/前端未上报）"
+            )
+            return self._read_done(post_id, stay, False, "timings")
+
         self._active_stay(page, stay)
 
         # 给 read-state 一个补充时间窗口
         if self._post_is_read(page, post_id):
-            return True
+            return self._read_done(post_id, stay, True, "dom")
 
         end = time.time() + READ_STATE_TIMEOUT
         while time.time() < end:
+            page.check()
             if self._post_is_read(page, post_id):
-                return True
+                return self._read_done(post_id, stay, True, "dom")
             time.sleep(0.6)
 
         logger.warning(
             f"⚠️ post_{post_id} 停留已达阈值但蓝点未消失（read-state.read 未出现，可能前端状态延迟/风控/显示不同步）"
         )
-        return False
+        return self._read_done(post_id, stay, False, "dom")
+
+    def _read_done(self, post_id, stay, confirmed, via) -> bool:
+        events.emit(ReadEvent(self._topic, post_id, round(stay, 2), confirmed, via))
+        return confirmed
 
     # ----------------------------
     # Near-bottom
@@ -563,15 +2049,23 @@ class LinuxDoBrowser:
     # ----------------------------
     # Browse replies (5-10 pages) + 只读蓝点楼层
     # ----------------------------
-    def browse_replies_pages(self, page, min_pages=5, max_pages=10):
+    def browse_replies_pages(
+        self, page, min_pages=5, max_pages=10, pages_done=0, target_pages=None, on_page=None
+    ):
+        """
+        pages_done / target_pages：从断点续跑时传入已计页数和原目标页数
+        on_page(pages_done, target_pages, max_no)：每计满一页回调一次（写断点）
+        """
         if max_pages < min_pages:
             max_pages = min_pages
-        target_pages = random.randint(min_pages, max_pages)
-        logger.info(f"目标：浏览评论 {target_pages} 页（按 PAGE_GROW={PAGE_GROW} 计页）")
+        if not target_pages:
+            target_pages = random.randint(min_pages, max_pages)
+        logger.info(
+            f"目标：浏览评论 {target_pages} 页（按 PAGE_GROW={PAGE_GROW} 计页），已完成 {pages_done} 页"
+        )
 
         self.wait_topic_posts_ready(page, timeout=60)
 
-        pages_done = 0
         last_max_no = self._max_post_number_in_dom(page)
         last_cnt = self._post_count_in_dom(page)
         logger.info(f"初始：max_post_no={last_max_no}, dom_posts={last_cnt}")
@@ -582,9 +2076,12 @@ class LinuxDoBrowser:
         seen_read_attempts = set()
 
         for i in range(max_loops):
+            page.check()
+
             # 1) 大步滚动推进
             scroll_distance = random.randint(SCROLL_MIN, SCROLL_MAX)
-            logger.info(f"[loop {i+1}] 向下滚动 {scroll_distance}px 浏览评论...")
+            if DEBUG:
+                logger.debug(f"[loop {i+1}] 向下滚动 {scroll_distance}px 浏览评论...")
             try:
                 page.run_js("window.scrollBy(0, arguments[0]);", scroll_distance)
             except Exception:
@@ -595,7 +2092,7 @@ class LinuxDoBrowser:
 
             # 3) 视口内只读蓝点楼层（最多 1~3 个）
             vp = self._list_visible_posts_in_viewport(page)
-            unread = [pid for pid in vp if self._post_has_blue_dot(page, pid)]
+            unread = self._posts_with_blue_dot(page, vp)
             unread = [pid for pid in unread if pid not in seen_read_attempts]
 
             if unread:
@@ -608,20 +2105,31 @@ class LinuxDoBrowser:
             cur_max_no = self._max_post_number_in_dom(page)
             cur_cnt = self._post_count_in_dom(page)
 
-            if cur_max_no - last_max_no >= PAGE_GROW:
+            page_counted = cur_max_no - last_max_no >= PAGE_GROW
+            if page_counted:
                 pages_done += 1
                 logger.success(
                     f"✅ 第 {pages_done}/{target_pages} 页：max_post_no {last_max_no} -> {cur_max_no}（dom_posts={cur_cnt}）"
                 )
+                events.emit(PageEvent(self._topic, pages_done, target_pages, last_max_no, cur_max_no))
                 last_max_no = cur_max_no
                 last_cnt = cur_cnt
+                if on_page:
+                    on_page(pages_done, target_pages, cur_max_no)
 
             # 5) near-bottom：额外停留 + 小步滚动，促发“加载更多 + timings 上报”
-            if self._near_bottom(page, gap=NEAR_BOTTOM_GAP):
+            near_bottom = self._near_bottom(page, gap=NEAR_BOTTOM_GAP)
+            sampled = page_counted or near_bottom or (i % max(1, EVENT_LOOP_SAMPLE) == 0)
+            events.emit(
+                LoopEvent(self._topic, i + 1, scroll_distance, cur_max_no, cur_cnt, pages_done, near_bottom),
+                "INFO" if sampled else "DEBUG",
+            )
+            if near_bottom:
                 extra = random.uniform(BOTTOM_EXTRA_STAY_MIN, BOTTOM_EXTRA_STAY_MAX)
-                logger.info(
-                    f"[loop {i+1}] 接近底部（gap<={NEAR_BOTTOM_GAP}px），额外停留≈{extra:.1f}s"
-                )
+                if DEBUG:
+                    logger.debug(
+                        f"[loop {i+1}] 接近底部（gap<={NEAR_BOTTOM_GAP}px），额外停留≈{extra:.1f}s"
+                    )
                 self._active_stay(page, extra)
 
             # 6) 达标退出
@@ -652,60 +2160,132 @@ class LinuxDoBrowser:
     # Browse from latest list
     # ----------------------------
     def click_topic(self):
+        self._ensure_browser()
+        remaining = [u for u in self.checkpoint.topics if u not in self.checkpoint.done_topics]
+        if remaining:
+            logger.info(
+                f"从断点续跑：剩余 {len(remaining)}/{len(self.checkpoint.topics)} 个主题帖"
+                f"（本轮最多 {self.max_topics} 个）"
+            )
+            for href in remaining[: self.max_topics]:
+                self.click_one_topic(href)
+                self.checkpoint.finish_topic(href)
+                self._mem_snapshot(f"topic {href}")
+            return True
+
+        if self.planned_topics:
+            count = min(self.max_topics, len(self.planned_topics))
+            logger.info(f"未读/新话题 {len(self.planned_topics)} 个，随机选择 {count} 个进行浏览")
+            hrefs = random.sample(self.planned_topics, count)
+        else:
+            hrefs = self._on_list_tab(self._pick_list_topics)
+        if hrefs is None:
+            return False
+
+        self.checkpoint.start_topics(hrefs)
+        for href in hrefs:
+            self.click_one_topic(href)
+            self.checkpoint.finish_topic(href)
+            self._mem_snapshot(f"topic {href}")
+
+        return True
+
+    def _pick_list_topics(self):
+        """从 /latest 随机选话题；找不到链接返回 None"""
         if not self.page.url.startswith("https://linux.do/latest"):
             self.page.get(LIST_URL)
 
         if not self._wait_any_topic_link(timeout=35):
             logger.error("未找到 a.raw-topic-link（主题标题链接）")
             logger.error(f"当前URL: {self.page.url}")
-            logger.error((self.page.html or "")[:500])
-            return False
+            self._dump_html(self.page, "click_topic")
+            return None
 
-        topic_links = self.page.eles("css:a.raw-topic-link")
+        topic_links = self.page.eles("a.raw-topic-link")
         if not topic_links:
             logger.error("主题链接列表为空")
             logger.error(f"当前URL: {self.page.url}")
-            logger.error((self.page.html or "")[:500])
-            return False
+            self._dump_html(self.page, "click_topic")
+            return None
 
-        count = min(MAX_TOPICS, len(topic_links))
+        count = min(self.max_topics, len(topic_links))
         logger.info(f"发现 {len(topic_links)} 个主题帖，随机选择 {count} 个进行浏览")
 
+        hrefs = []
         for a in random.sample(topic_links, count):
             href = a.attr("href")
             if not href:
                 continue
             if href.startswith("/"):
                 href = "https://linux.do" + href
-            self.click_one_topic(href)
-
-        return True
+            hrefs.append(href)
+        return hrefs
 
     @retry_decorator()
     def click_one_topic(self, topic_url):
-        new_page = self.browser.new_tab()
+        # 断点续跑：直接定位到上次的最大楼层，接着计页
+        cur = self.checkpoint.current
+        resume = cur if cur.get("url") == topic_url else {}
+        pages_done = int(resume.get("pages_done") or 0)
+
+        def on_page(done, target, max_no):
+            self.checkpoint.save_page(topic_url, done, target, max_no)
+
+        # 话题总时限跨重试累计：换新 tab 续跑不会重置
+        deadline = self._topic_deadlines.setdefault(topic_url, time.time() + TOPIC_TIMEOUT)
+        self._topic = topic_url
+        topic_t0 = time.time()
+        new_page = self.new_tab(deadline=deadline)
         try:
-            new_page.get(topic_url)
+            # 订阅网络事件：以 /topics/timings 成功返回确认阅读
+            tracker = ReadTimingsTracker()
+            try:
+                new_page.listen_network(tracker.handle_event)
+                new_page.read_tracker = tracker
+            except Exception as e:
+                logger.warning(f"网络事件订阅失败，回退到 DOM read-state 判断: {e}")
+
+            new_page.get(_topic_url_at(topic_url, int(resume.get("max_no") or 0)))
 
             self.wait_topic_posts_ready(new_page, timeout=60)
             time.sleep(random.uniform(1.0, 2.0))
 
-            # 点赞（可选）
-            if random.random() < LIKE_PROB:
+            # 点赞（可选；续跑时已经点过）
+            if not resume and random.random() < LIKE_PROB:
                 self.click_like(new_page)
 
             ok = self.browse_replies_pages(
                 new_page,
-                min_pages=MIN_COMMENT_PAGES,
-                max_pages=MAX_COMMENT_PAGES,
+                min_pages=self.min_comment_pages,
+                max_pages=self.max_comment_pages,
+                pages_done=pages_done,
+                target_pages=resume.get("target_pages"),
+                on_page=on_page,
             )
             if not ok:
                 logger.warning("本主题未达到最小评论页数目标（可能帖子很短/到底/加载慢）")
+            summary = new_page.read_tracker.summary() if new_page.read_tracker else ""
+            if summary:
+                logger.info(summary)
+            events.emit(
+                PhaseEvent("topic", "ok" if ok else "fail", round(time.time() - topic_t0, 2), detail=summary)
+            )
+        except TabStuckError as e:
+            self.incidents.append(f"{topic_url}: {e.reason}")
+            logger.error(f"🐶 看门狗：{e.reason}，关闭该 tab（{topic_url}）")
+            events.emit(
+                PhaseEvent("topic", "stuck", round(time.time() - topic_t0, 2), detail=e.reason), "WARNING"
+            )
+            if e.deadline:
+                # 超出话题总时限：放弃该话题
+                return
+            # tab 卡死：由 retry_decorator 换新 tab，从断点续跑
+            raise
         finally:
             try:
                 new_page.close()
-            except Exception:
-                pass
+            except Exception as e:
+                logger.warning(f"关闭话题 tab 失败: {e}")
 
     # ----------------------------
     # Like
@@ -749,6 +2329,63 @@ class LinuxDoBrowser:
 
         print("--------------Connect Info-----------------")
         print(tabulate(info, headers=["项目", "当前", "要求"], tablefmt="pretty"))
+        self.connect_info = info
+        return info
+
+    # ----------------------------
+    # Workload pre-check
+    # ----------------------------
+    def _fetch_unread_topics(self):
+        """未读 + 新话题的 URL（各取列表第一页，去重）；失败返回 None"""
+        urls = []
+        for url in (UNREAD_URL, NEW_URL):
+            try:
+                resp = self.session.get(
+                    url,
+                    headers=self._api_headers(),
+                    impersonate="chrome136",
+                    allow_redirects=True,
+                    timeout=30,
+                )
+                topic_list = (resp.json() or {}).get("topic_list") if resp.status_code == 200 else None
+            except Exception as e:
+                logger.warning(f"获取未读数失败 {url}: {e}")
+                return None
+            # 限流（429）/ 出错时 Discourse 返回 {"errors": [...]}：当作未知，不能当成 0 个未读走快速路径
+            if not isinstance(topic_list, dict) or not isinstance(topic_list.get("topics"), list):
+                logger.warning(f"获取未读数失败 {url}: HTTP {resp.status_code}，响应里没有 topic_list.topics")
+                return None
+            for t in topic_list["topics"]:
+                if not t.get("id"):
+                    continue
+                href = f"https://linux.do/t/{t.get('slug') or 'topic'}/{t['id']}"
+                if href not in urls:
+                    urls.append(href)
+        return urls
+
+    def plan_workload(self):
+        """
+        按 connect 要求表（当前 vs 要求）和未读数确定本次浏览量：
+        - 浏览话题 / 已读帖子都已达标，或没有任何未读 => 只登录不浏览
+        - 否则按缺口收缩话题数和每个话题的评论页数（不超过配置上限）
+        """
+        unread_topics = self._fetch_unread_topics()
+        unread = None if unread_topics is None else len(unread_topics)
+        plan = build_workload_plan(self.connect_info, unread)
+        # 话题数按未读/新话题收缩过：就从这些话题里选，而不是去 /latest 随机挑（可能都已读）
+        self.planned_topics = unread_topics or []
+        if plan["fast_path"]:
+            logger.success(f"⚡ 工作量预检：{plan['reason']}，跳过浏览")
+            return plan
+
+        self.max_topics = plan["topics"]
+        self.min_comment_pages = plan["min_pages"]
+        self.max_comment_pages = plan["max_pages"]
+        logger.info(
+            f"工作量预检：{plan['reason']} => 话题 {self.max_topics} 个，"
+            f"评论 {self.min_comment_pages}-{self.max_comment_pages} 页"
+        )
+        return plan
 
     # ----------------------------
     # Notifications
@@ -757,10 +2394,13 @@ class LinuxDoBrowser:
         status_msg = f"✅每日登录成功: {USERNAME}"
         if browse_enabled:
             status_msg += (
-                f" + 浏览任务完成(话题<= {MAX_TOPICS} 个, 评论{MIN_COMMENT_PAGES}-{MAX_COMMENT_PAGES}页, "
+                f" + 浏览任务完成(话题<= {self.max_topics} 个, "
+                f"评论{self.min_comment_pages}-{self.max_comment_pages}页, "
                 f"PAGE_GROW={PAGE_GROW}, MIN_READ_STAY={MIN_READ_STAY}s, READ_STATE_TIMEOUT={READ_STATE_TIMEOUT}s, "
                 f"HEADLESS={HEADLESS}, port={self._debug_port})"
             )
+        if self.incidents:
+            status_msg += f"\n⚠️ 看门狗处理 {len(self.incidents)} 次：" + "；".join(self.incidents)
 
         if GOTIFY_URL and GOTIFY_TOKEN:
             try:
@@ -820,45 +2460,166 @@ class LinuxDoBrowser:
     # ----------------------------
     def run(self):
         try:
-            login_res = self.login()
-            if not login_res:
-                logger.warning("登录失败，后续任务可能无法进行")
+            self.run_once()
+        finally:
+            self.close()
 
-            if BROWSE_ENABLED:
-                click_topic_res = self.click_topic()
-                if not click_topic_res:
-                    logger.error("点击主题失败，程序终止")
-                    return
-                logger.info("完成浏览任务（含评论浏览）")
+    def _mem_snapshot(self, label):
+        if self.profiler:
+            self.profiler.snapshot(label)
 
-            self.send_notifications(BROWSE_ENABLED)
+    def run_once(self):
+        """
+        一次完整任务：登录/续跑 -> 预检 -> 浏览 -> 通知
+        不关闭浏览器；常驻模式下反复调用
+        PROFILE_DIR 开启时整个任务在采样剖析 + tracemalloc 下运行
+        """
+        self.profiler = RunProfiler.from_env()
+        if self.profiler:
+            self.profiler = self.profiler.start()
+        try:
+            self._run_once()
         finally:
+            if self.profiler:
+                self.profiler.stop()
+                self.profiler = None
+
+    def _run_once(self):
+        self._reset_run_state()
+        run_t0 = time.time()
+        self.checkpoint.load()
+        if self.logged_in:
+            # 常驻模式：会话由任务间的健康检查维护
+            logger.info("复用已登录会话")
+            self.print_connect_info()
+            login_res = True
+        else:
+            # 断点（含上一轮的 completed 断点）里有未过期的会话 => 先尝试复用，失效再登录
+            login_res = self.resume_session() or self.login()
+        if not login_res:
+            logger.warning("登录失败，后续任务可能无法进行")
+        events.emit(PhaseEvent("login", "ok" if login_res else "fail", round(time.time() - run_t0, 2)))
+        self._mem_snapshot("after-login")
+
+        # 快速路径下登录 + 带会话的 API 请求已计入当日访问，浏览器不再导航
+        browse = BROWSE_ENABLED
+        if browse and login_res and WORKLOAD_PRECHECK:
+            plan = self.plan_workload()
+            browse = not plan["fast_path"]
+            events.emit(PhaseEvent("plan", "skip" if plan["fast_path"] else "ok", detail=plan["reason"]))
+
+        if browse:
+            browse_t0 = time.time()
+            if login_res:
+                self._enter_browser()
+            click_topic_res = self.click_topic()
+            self._sync_cookies_from_browser()
+            events.emit(
+                PhaseEvent("browse", "ok" if click_topic_res else "fail", round(time.time() - browse_t0, 2))
+            )
+            if not click_topic_res:
+                logger.error("点击主题失败，程序终止")
+                events.emit(PhaseEvent("run", "fail", round(time.time() - run_t0, 2)), "WARNING")
+                return
+            logger.info("完成浏览任务（含评论浏览）")
+
+        self.checkpoint.complete()
+        self.send_notifications(browse)
+        events.emit(
+            PhaseEvent("run", "ok", round(time.time() - run_t0, 2), detail=f"incidents={len(self.incidents)}")
+        )
+
+    # ----------------------------
+    # Health check (daemon)
+    # ----------------------------
+    def health_check(self):
+        """
+        任务间健康检查：
+        - 浏览器无响应 / 运行超过 BROWSER_MAX_AGE => 重启浏览器
+        - 会话失效 => 下一轮重新登录
+        浏览器还没启动过（只走了快速路径）时跳过浏览器检查
+        """
+        if self.browser is not None:
+            alive = False
             try:
-                self.page.close()
-            except Exception:
-                pass
-            try:
-                self.browser.quit()
+                alive = self.page.run_js("return 1;") == 1
             except Exception:
                 pass
+            age = time.time() - self.browser_started_at
+            if not alive:
+                logger.warning("健康检查：浏览器无响应")
+                self.relaunch_browser()
+            elif age > BROWSER_MAX_AGE:
+                logger.info(f"健康检查：浏览器已运行 {age / 3600:.1f}h，定期重启")
+                self.relaunch_browser()
+
+        if self.logged_in:
+            self._sync_cookies_from_browser()
+        if self.logged_in and not self.session_valid():
+            logger.warning("健康检查：会话已失效，下一轮重新登录")
+            self.logged_in = False
+            self.session.cookies.clear()
+
+    def close(self):
+        self._quit_browser()
+        try:
+            # 清理 profile
+            for _ in range(3):
+                try:
+                    if self._profile_dir is not None and self._profile_dir.exists():
+                        for p in self._profile_dir.rglob("*"):
+                            try:
+                                p.chmod(0o777)
+                            except Exception:
+                                pass
+                        # 递归删除
+                        import shutil
+                        shutil.rmtree(self._profile_dir, ignore_errors=True)
+                    break
+                except Exception:
+                    time.sleep(0.5)
+        except Exception:
+            pass
+
+
+# ----------------------------
+# Daemon
+# ----------------------------
+def _next_delay():
+    return max(60.0, DAEMON_INTERVAL + random.uniform(-DAEMON_JITTER, DAEMON_JITTER))
+
+
+def _health_interval():
+    # <=0 时不能变成 sleep(0) 连续打 session/current.json
+    return max(60.0, DAEMON_HEALTH_INTERVAL)
+
+
+def run_daemon():
+    """
+    常驻模式：一个进程 + 一个 LinuxDoBrowser 跨多次任务复用（浏览器保持热启动、会话保持登录）
+    任务按 DAEMON_INTERVAL ± DAEMON_JITTER 调度，间隙里每 DAEMON_HEALTH_INTERVAL 做一次健康检查
+    """
+    # SIGTERM（docker stop / systemd）=> 走 finally 正常清理浏览器和 profile
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    l = LinuxDoBrowser()
+    try:
+        while True:
             try:
-                # 清理 profile
-                for _ in range(3):
-                    try:
-                        if self._profile_dir.exists():
-                            for p in self._profile_dir.rglob("*"):
-                                try:
-                                    p.chmod(0o777)
-                                except Exception:
-                                    pass
-                            # 递归删除
-                            import shutil
-                            shutil.rmtree(self._profile_dir, ignore_errors=True)
-                        break
-                    except Exception:
-                        time.sleep(0.5)
-            except Exception:
-                pass
+                l.run_once()
+            except Exception as e:
+                logger.error(f"本轮任务异常: {e}")
+
+            next_at = time.time() + _next_delay()
+            logger.info(f"下一轮任务：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(next_at))}")
+            while time.time() < next_at:
+                time.sleep(max(0.0, min(_health_interval(), next_at - time.time())))
+                try:
+                    l.health_check()
+                except Exception as e:
+                    logger.error(f"健康检查异常: {e}")
+    finally:
+        l.close()
 
 
 if __name__ == "__main__":
@@ -866,5 +2627,8 @@ if __name__ == "__main__":
         print("Please set LINUXDO_USERNAME/LINUXDO_PASSWORD (or USERNAME/PASSWORD)")
         raise SystemExit(1)
 
-    l = LinuxDoBrowser()
-    l.run()
+    if "--daemon" in sys.argv[1:]:
+        run_daemon()
+    else:
+        l = LinuxDoBrowser()
+        l.run()